@@ -1,36 +1,123 @@
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Results of the last full probe, keyed by interpreter and import path state
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "mtd_deps.json")
+
+# Display name and import name of every required package
+DEPENDENCIES = (
+    ('FastAPI', 'fastapi'),
+    ('Uvicorn', 'uvicorn'),
+    ('PIL (Pillow)', 'PIL'),
+    ('PyTorch', 'torch'),
+    ('OpenCV', 'cv2'),
+    ('Transformers', 'transformers'),
+    ('EasyOCR', 'easyocr'),
+    ('Datasets', 'datasets'),
+    ('Python-dotenv', 'dotenv'),
+    ('Pydantic', 'pydantic'),
+    ('NumPy', 'numpy'),
+)
+
+# Packages whose import is expensive (torch, model registries); only locate them
+HEAVY_PACKAGES = frozenset({'torch', 'cv2', 'transformers', 'easyocr', 'datasets'})
+
+def environment_key():
+    """Identify the interpreter and the current state of its import path."""
+    parts = [sys.executable]
+    for entry in sys.path:
+        # Installing or removing a package touches its site directory
+        try:
+            parts.append(f"{entry}:{os.stat(entry).st_mtime_ns}")
+        except OSError:
+            parts.append(entry)
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+def load_cache():
+    """Load the probe cache, treating a missing or corrupt file as empty."""
+    try:
+        with open(CACHE_PATH) as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def save_cache(cache):
+    """Write the probe cache atomically; failures only cost a re-probe."""
+    tmp_path = None
+    try:
+        cache_dir = os.path.dirname(CACHE_PATH)
+        os.makedirs(cache_dir, exist_ok=True)
+        # A unique temporary file per run, so concurrent runs never write
+        # into the same file before the rename
+        with tempfile.NamedTemporaryFile("w", dir=cache_dir, suffix=".tmp", delete=False) as f:
+            tmp_path = f.name
+            json.dump(cache, f)
+        os.replace(tmp_path, CACHE_PATH)
+    except OSError:
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+def probe_package(package):
+    """Return None if the package can be found, otherwise the error message."""
+    try:
+        if package in HEAVY_PACKAGES:
+            # find_spec locates the package without executing its __init__
+            if importlib.util.find_spec(package) is None:
+                raise ImportError(f"No module named '{package}'")
+        else:
+            # Cheap packages are imported so broken installs are caught too
+            __import__(package)
+        return None
+    except ImportError as e:
+        return str(e)
+
 def check_imports():
-    dependencies = {
-        'FastAPI': 'fastapi',
-        'Uvicorn': 'uvicorn',
-        'PIL (Pillow)': 'PIL',
-        'PyTorch': 'torch',
-        'OpenCV': 'cv2',
-        'Transformers': 'transformers',
-        'EasyOCR': 'easyocr',
-        'Datasets': 'datasets',
-        'Python-dotenv': 'dotenv',
-        'Pydantic': 'pydantic',
-        'NumPy': 'numpy'
-    }
-    
-    print("Checking dependencies...")
-    print("-" * 50)
+    separator = "-" * 50
+    lines = ["Checking dependencies...", separator]
     
     all_installed = True
     
-    for name, package in dependencies.items():
-        try:
-            __import__(package)
-            print(f"✅ {name:<20} is installed")
-        except ImportError as e:
-            print(f"❌ {name:<20} is NOT installed - Error: {str(e)}")
+    packages = [package for _, package in DEPENDENCIES]
+    key = environment_key()
+    cache = load_cache()
+    cached = cache.get(key, [])
+    
+    if set(cached).issuperset(packages):
+        # Nothing changed since every package was last found
+        errors = [None] * len(packages)
+    else:
+        # Probe all packages concurrently; map() keeps the original order
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            errors = list(executor.map(probe_package, packages))
+        found = [package for package, error in zip(packages, errors) if error is None]
+        # Keep the entries of other interpreters and virtual environments
+        cache[key] = found
+        save_cache(cache)
+    
+    for (name, _), error in zip(DEPENDENCIES, errors):
+        if error is None:
+            lines.append(f"✅ {name:<20} is installed")
+        else:
+            lines.append(f"❌ {name:<20} is NOT installed - Error: {error}")
             all_installed = False
     
-    print("-" * 50)
+    lines.append(separator)
     if all_installed:
-        print("All dependencies are installed successfully! 🎉")
+        lines.append("All dependencies are installed successfully! 🎉")
     else:
-        print("Some dependencies are missing. Please install them using pip install -r requirements.txt")
+        lines.append("Some dependencies are missing. Please install them using pip install -r requirements.txt")
+    
+    # Emit the whole report with a single write
+    sys.stdout.write("\n".join(lines) + "\n")
 
 if __name__ == "__main__":
     check_imports() 
\ No newline at end of file
@@ -1,59 +1,103 @@
 import cv2
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
+import hashlib
 import os
+import tempfile
+from functools import lru_cache
 
-def create_prescription_image(output_path="sample_prescription.jpg"):
+@lru_cache(maxsize=16)
+def text_ascent(font_face, font_scale, thickness):
+    """Return the cap height of a Hershey font, measured once per setting."""
+    (_, ascent), _ = cv2.getTextSize("A", font_face, font_scale, thickness)
+    return ascent
+
+# Top-left position and content of the static clinic/patient header
+HEADER_LINES = (
+    ((50, 50), "Dr. Smith Medical Clinic"),
+    ((50, 90), "123 Health Street, Medical City"),
+    ((50, 130), "Phone: (123) 456-7890"),
+    ((50, 200), "Patient: John Doe"),
+    ((50, 240), "Date: 2023-10-15"),
+)
+
+# Number of canvas rows covered by the header block
+HEADER_HEIGHT = 280
+
+# Horizontal margin, row and thickness of the line below the clinic details
+HEADER_SEPARATOR = (50, 180, 2)
+
+# Top-left position and content of the prescription body
+PRESCRIPTION_LINES = (
+    ((50, 300), "Rx:"),
+    ((100, 350), "Amoxicillin 500mg"),
+    ((100, 390), "Take 1 capsule three times daily for 7 days"),
+    ((100, 450), "Metformin 1000mg"),
+    ((100, 490), "Take 1 tablet twice daily with meals"),
+    ((50, 600), "Signature: ___________________"),
+)
+
+def header_cache_path(*drawing_params):
+    """Return where the header strip drawn with these parameters is cached."""
+    # Every input of the drawing code is part of the key, so changing any
+    # of them renders a new strip instead of reusing a stale one
+    key = repr((HEADER_LINES, HEADER_HEIGHT, HEADER_SEPARATOR) + drawing_params).encode()
+    digest = hashlib.sha1(key).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), f"prescription_header_{digest}.png")
+
+def create_prescription_image(output_path="sample_prescription.png"):
     """Create a sample prescription image for testing."""
-    # Create a white image
+    # Create a white canvas
     width, height = 800, 1000
-    image = Image.new('RGB', (width, height), color='white')
-    draw = ImageDraw.Draw(image)
-    
-    # Try to use a font that looks like handwriting
-    try:
-        # Try to use a system font
-        font_path = "C:\\Windows\\Fonts\\comic.ttf"  # Comic Sans as fallback
-        if os.path.exists(font_path):
-            font = ImageFont.truetype(font_path, 24)
-        else:
-            font = ImageFont.load_default()
-    except Exception:
-        font = ImageFont.load_default()
-    
-    # Add a header
-    draw.text((50, 50), "Dr. Smith Medical Clinic", fill='black', font=font)
-    draw.text((50, 90), "123 Health Street, Medical City", fill='black', font=font)
-    draw.text((50, 130), "Phone: (123) 456-7890", fill='black', font=font)
-    
-    # Add a line
-    draw.line([(50, 180), (width-50, 180)], fill='black', width=2)
-    
-    # Add patient information
-    draw.text((50, 200), "Patient: John Doe", fill='black', font=font)
-    draw.text((50, 240), "Date: 2023-10-15", fill='black', font=font)
-    
-    # Add prescription details
-    draw.text((50, 300), "Rx:", fill='black', font=font)
-    draw.text((100, 350), "Amoxicillin 500mg", fill='black', font=font)
-    draw.text((100, 390), "Take 1 capsule three times daily for 7 days", fill='black', font=font)
-    
-    draw.text((100, 450), "Metformin 1000mg", fill='black', font=font)
-    draw.text((100, 490), "Take 1 tablet twice daily with meals", fill='black', font=font)
-    
-    # Add signature
-    draw.text((50, 600), "Signature: ___________________", fill='black', font=font)
-    
-    # Add some noise to make it look more realistic
-    image_array = np.array(image)
-    noise = np.random.normal(0, 5, image_array.shape).astype(np.uint8)
-    noisy_image = cv2.add(image_array, noise)
-    
-    # Add slight blur to simulate scanning
-    blurred_image = cv2.GaussianBlur(noisy_image, (3, 3), 0)
-    
-    # Save the image
-    cv2.imwrite(output_path, blurred_image)
+    canvas = np.full((height, width, 3), 255, np.uint8)
+    
+    # Hershey fonts are rendered by OpenCV directly, no font file needed
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    black = (0, 0, 0)
+    
+    # putText anchors at the baseline; shift down so y is the top of the text
+    ascent = text_ascent(font, 0.7, 1)
+    
+    put = cv2.putText
+    
+    # Reuse the header strip rendered by a previous run when available
+    cache_path = header_cache_path(width, font, 0.7, 1, black, cv2.LINE_AA)
+    header = cv2.imread(cache_path) if os.path.exists(cache_path) else None
+    if header is not None and header.shape == canvas[:HEADER_HEIGHT].shape:
+        np.copyto(canvas[:HEADER_HEIGHT], header)
+    else:
+        # Add header text with a separator line below the clinic details
+        for (x, y), text in HEADER_LINES:
+            put(canvas, text, (x, y + ascent), font, 0.7, black, 1, cv2.LINE_AA)
+        margin, y, thickness = HEADER_SEPARATOR
+        cv2.line(canvas, (margin, y), (width - margin, y), black, thickness)
+        cv2.imwrite(cache_path, canvas[:HEADER_HEIGHT])
+    
+    # Add prescription text
+    for (x, y), text in PRESCRIPTION_LINES:
+        put(canvas, text, (x, y + ascent), font, 0.7, black, 1, cv2.LINE_AA)
+    
+    # Add some noise to make it look more realistic (in place)
+    noise = np.empty(canvas.shape, dtype=np.int16)
+    cv2.randn(noise, (0, 0, 0), (5, 5, 5))
+    cv2.add(canvas, noise, dst=canvas, dtype=cv2.CV_8U)
+    
+    # Add slight blur to simulate scanning (in place)
+    kernel = cv2.getGaussianKernel(3, 0)
+    cv2.sepFilter2D(canvas, -1, kernel, kernel, dst=canvas, borderType=cv2.BORDER_REFLECT_101)
+    
+    # Save the image; PNG is lossless and cheap to encode at low compression
+    if output_path.lower().endswith(".png"):
+        params = [
+            cv2.IMWRITE_PNG_COMPRESSION, 1,
+            cv2.IMWRITE_PNG_STRATEGY, cv2.IMWRITE_PNG_STRATEGY_FILTERED,
+        ]
+    else:
+        params = [
+            cv2.IMWRITE_JPEG_QUALITY, 85,
+            cv2.IMWRITE_JPEG_OPTIMIZE, 1,
+            cv2.IMWRITE_JPEG_PROGRESSIVE, 0,
+        ]
+    cv2.imwrite(output_path, canvas, params)
     print(f"Sample prescription image created at: {output_path}")
     return output_path
 
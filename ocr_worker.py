@@ -0,0 +1,203 @@
+import itertools
+import logging
+import multiprocessing
+import pickle
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Request id of the message a worker sends once its reader is ready to serve
+READY = "ready"
+
+def portable_error(e: Exception) -> Exception:
+    """Return the exception, or a RuntimeError copy if it cannot be pickled."""
+    try:
+        pickle.dumps(e)
+        return e
+    except Exception:
+        return RuntimeError(str(e))
+
+def worker_main(request_queue, response_queue, current_request, gpu: bool, max_tasks: int) -> None:
+    """Own an EasyOCR reader and serve requests until max_tasks are handled."""
+    try:
+        # Heavy imports happen only in the worker process
+        import easyocr
+        import numpy as np
+        import torch
+        
+        reader = easyocr.Reader(['en'], gpu=gpu, cudnn_benchmark=True)
+        
+        # The first dummy inference is a warmup so real requests skip kernel setup
+        reader.readtext(np.zeros((600, 800, 3), dtype=np.uint8))
+    except Exception as e:
+        # Report why the reader could not be built instead of exiting silently
+        response_queue.put((READY, None, portable_error(e)))
+        return
+    
+    # Tell the parent the reader is up; a worker that exits before this is
+    # not restarted
+    response_queue.put((READY, None, None))
+    
+    handled = 0
+    while max_tasks <= 0 or handled < max_tasks:
+        task = request_queue.get()
+        if task is None:
+            break
+        
+        # Record the request being served so a crash fails only this one
+        request_id, method, args, kwargs = task
+        current_request.value = request_id
+        try:
+            result = getattr(reader, method)(*args, **kwargs)
+            response_queue.put((request_id, result, None))
+        except Exception as e:
+            # Release cached CUDA blocks so the caller's retry has room to run
+            if isinstance(e, torch.cuda.OutOfMemoryError):
+                torch.cuda.empty_cache()
+            
+            # Make sure the error can travel back to the parent process
+            response_queue.put((request_id, None, portable_error(e)))
+        current_request.value = -1
+        handled += 1
+
+class OCRWorker:
+    """Proxy forwarding EasyOCR reader calls to a dedicated worker process.
+    
+    EasyOCR leaks memory across readtext calls and only releases it when
+    the owning process exits, so the worker retires after max_tasks
+    requests and is replaced by a fresh one.
+    """
+    
+    def __init__(self, gpu: bool = False, max_tasks: int = 0):
+        self.gpu = gpu
+        self.max_tasks = max_tasks
+        self._context = multiprocessing.get_context("spawn")
+        self._requests = self._context.Queue()
+        self._responses = self._context.Queue()
+        # Lock-free, so a worker killed while writing it cannot leave a lock held
+        self._current_request = self._context.Value("q", -1, lock=False)
+        self._pending: Dict[int, Tuple[Future, tuple]] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._ready = False
+        self._failure: Optional[str] = None
+        self._process: Optional[multiprocessing.Process] = None
+        
+        self._start_process()
+        self._collector = threading.Thread(target=self._collect, name="ocr-collector", daemon=True)
+        self._collector.start()
+    
+    def _start_process(self) -> None:
+        """Spawn a new worker process reading from the shared request queue."""
+        self._current_request.value = -1
+        self._ready = False
+        self._process = self._context.Process(
+            target=worker_main,
+            args=(self._requests, self._responses, self._current_request, self.gpu, self.max_tasks),
+            daemon=True
+        )
+        self._process.start()
+    
+    def _replace_queues(self) -> None:
+        """Give the next worker fresh queues, re-submitting every pending request."""
+        # A killed worker may die holding a queue's lock, which would block
+        # its successor forever; nothing more is read from the old queues
+        for old_queue in (self._requests, self._responses):
+            old_queue.cancel_join_thread()
+            old_queue.close()
+        self._requests = self._context.Queue()
+        self._responses = self._context.Queue()
+        for _, task in self._pending.values():
+            self._requests.put(task)
+    
+    def _fail(self, reason: str) -> None:
+        """Fail every pending call and refuse new ones; the lock must be held."""
+        logger.error(reason)
+        self._failure = reason
+        for future, _ in self._pending.values():
+            future.set_exception(RuntimeError(reason))
+        self._pending.clear()
+    
+    def _collect(self) -> None:
+        """Resolve pending calls and replace the worker when it exits."""
+        while not self._closed:
+            try:
+                request_id, result, error = self._responses.get(timeout=1)
+            except queue.Empty:
+                self._check_process()
+                continue
+            
+            if request_id == READY:
+                with self._lock:
+                    if error is None:
+                        self._ready = True
+                    else:
+                        self._fail(f"OCR worker failed to start: {error}")
+                continue
+            
+            with self._lock:
+                entry = self._pending.pop(request_id, None)
+            if entry is None:
+                continue
+            future, _ = entry
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+    
+    def _check_process(self) -> None:
+        """Restart a retired or crashed worker process."""
+        with self._lock:
+            if self._closed or self._failure is not None or self._process.is_alive():
+                return
+            
+            exitcode = self._process.exitcode
+            if not self._ready:
+                # The reader never came up; a new worker would fail the same way
+                self._fail(f"OCR worker exited with code {exitcode} before it was ready")
+                return
+            
+            if exitcode != 0:
+                # A crash loses only the in-flight request; fail it rather than
+                # leave its caller waiting forever. Requests still queued are
+                # served by the new worker
+                logger.error(f"OCR worker exited unexpectedly with code {exitcode}")
+                entry = self._pending.pop(self._current_request.value, None)
+                if entry is not None:
+                    entry[0].set_exception(RuntimeError("OCR worker exited unexpectedly"))
+                self._replace_queues()
+            
+            logger.info("Starting a new OCR worker process")
+            self._start_process()
+    
+    def call(self, method: str, *args, **kwargs) -> Any:
+        """Run a reader method in the worker and wait for its result."""
+        future: Future = Future()
+        with self._lock:
+            if self._failure is not None:
+                raise RuntimeError(self._failure)
+            request_id = next(self._ids)
+            task = (request_id, method, args, kwargs)
+            self._pending[request_id] = (future, task)
+            # Queued under the lock so a queue replacement cannot miss it
+            self._requests.put(task)
+        return future.result()
+    
+    def readtext(self, *args, **kwargs) -> Any:
+        """Proxy for easyocr.Reader.readtext."""
+        return self.call("readtext", *args, **kwargs)
+    
+    def readtext_batched(self, *args, **kwargs) -> Any:
+        """Proxy for easyocr.Reader.readtext_batched."""
+        return self.call("readtext_batched", *args, **kwargs)
+    
+    def close(self) -> None:
+        """Ask the worker to stop and wait briefly for it to exit."""
+        self._closed = True
+        self._requests.put(None)
+        if self._process is not None:
+            self._process.join(timeout=5)
@@ -0,0 +1,494 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // DOM elements
+    const fileInput = document.getElementById('prescription-image');
+    const fileList = document.getElementById('file-list');
+    const uploadBtn = document.getElementById('upload-btn');
+    const loading = document.getElementById('loading');
+    const results = document.getElementById('results');
+
+    // Crop modal elements
+    const cropModal = document.getElementById('crop-modal');
+    const cropImage = document.getElementById('crop-image');
+    const cropBtn = document.getElementById('crop-btn');
+    const cancelCropBtn = document.getElementById('cancel-crop-btn');
+    const closeCropBtn = document.getElementById('close-crop-btn');
+    const errorMessage = document.getElementById('error-message');
+
+    // State variables
+    let selectedFiles = [];
+    let cropper = null;
+    let currentCropIndex = -1;
+    let currentImageUrl = null;
+
+    // Initialize file input change handler
+    fileInput.addEventListener('change', function(e) {
+        const files = Array.from(e.target.files);
+        if (files.length > 0) {
+            // Initialize selected files; cropping replaces the file itself
+            const newFiles = files.map(file => ({
+                file: file,
+                cropped: false
+            }));
+            selectedFiles = [...selectedFiles, ...newFiles];
+            updateFileList();
+        }
+    });
+
+    // Update the file list display
+    function updateFileList() {
+        fileList.style.display = selectedFiles.length > 0 ? 'block' : 'none';
+
+        // Build the items off-DOM and attach them in one operation
+        const fragment = document.createDocumentFragment();
+
+        selectedFiles.forEach((fileData, index) => {
+            const fileItem = document.createElement('div');
+            fileItem.className = 'file-item';
+
+            const fileName = document.createElement('div');
+            fileName.className = 'file-name';
+            fileName.innerHTML = `
+                <span class="material-icons">description</span>
+                ${fileData.file.name}
+                ${fileData.cropped ? '<span class="file-badge">Cropped</span>' : ''}
+            `;
+
+            const actions = document.createElement('div');
+            actions.className = 'file-actions';
+            actions.innerHTML = `
+                <button class="action-btn crop" data-index="${index}" title="Crop Image">
+                    <span class="material-icons">crop</span>
+                </button>
+                <button class="action-btn remove" data-index="${index}" title="Remove File">
+                    <span class="material-icons">delete</span>
+                </button>
+            `;
+
+            fileItem.appendChild(fileName);
+            fileItem.appendChild(actions);
+            fragment.appendChild(fileItem);
+        });
+
+        fileList.replaceChildren(fragment);
+    }
+
+    // Handle the action buttons of every file item with one delegated listener
+    fileList.addEventListener('click', function(e) {
+        const cropButton = e.target.closest('.action-btn.crop');
+        const removeButton = e.target.closest('.action-btn.remove');
+
+        if (cropButton) {
+            openCropModal(parseInt(cropButton.dataset.index));
+        } else if (removeButton) {
+            selectedFiles.splice(parseInt(removeButton.dataset.index), 1);
+            updateFileList();
+        }
+    });
+
+    // Longest side of the image handed to the cropper; a little above the
+    // 2000px upload cap so crops of most of the image still reach that cap
+    const MAX_PREVIEW_SIDE = 2400;
+
+    // Decode the image off the main thread and return a URL for the cropper;
+    // large scans are downscaled so the cropper never handles full-size pixels
+    async function createPreviewUrl(file) {
+        if (!window.createImageBitmap) {
+            return URL.createObjectURL(file);
+        }
+
+        const bitmap = await createImageBitmap(file);
+        const scale = MAX_PREVIEW_SIDE / Math.max(bitmap.width, bitmap.height);
+        if (scale >= 1) {
+            bitmap.close();
+            return URL.createObjectURL(file);
+        }
+
+        const resized = await createImageBitmap(bitmap, {
+            resizeWidth: Math.round(bitmap.width * scale),
+            resizeHeight: Math.round(bitmap.height * scale),
+            resizeQuality: 'high'
+        });
+        bitmap.close();
+
+        // Hand the bitmap to a canvas without copying, then encode it once;
+        // an OffscreenCanvas keeps the scratch canvas out of the document
+        if (window.OffscreenCanvas) {
+            const canvas = new OffscreenCanvas(resized.width, resized.height);
+            canvas.getContext('bitmaprenderer').transferFromImageBitmap(resized);
+
+            const blob = await canvas.convertToBlob({ type: 'image/jpeg', quality: 0.92 });
+            return URL.createObjectURL(blob);
+        }
+
+        const canvas = document.createElement('canvas');
+        canvas.width = resized.width;
+        canvas.height = resized.height;
+        canvas.getContext('bitmaprenderer').transferFromImageBitmap(resized);
+
+        const blob = await new Promise(resolve => canvas.toBlob(resolve, 'image/jpeg', 0.92));
+        return URL.createObjectURL(blob);
+    }
+
+    // Open crop modal and initialize image for cropping
+    async function openCropModal(index) {
+        try {
+            currentCropIndex = index;
+            const fileData = selectedFiles[index];
+
+            // Reset error message
+            errorMessage.style.display = 'none';
+
+            // Show modal
+            cropModal.style.display = 'block';
+            document.body.style.overflow = 'hidden'; // Prevent scrolling
+
+            // Reset image and destroy any existing cropper
+            if (cropper) {
+                cropper.destroy();
+                cropper = null;
+            }
+
+            // Create URL for the image and set it as the source
+            revokeCurrentImageUrl();
+            const imageUrl = await createPreviewUrl(fileData.file);
+
+            // The modal may have been closed while the image was decoding
+            if (currentCropIndex !== index) {
+                URL.revokeObjectURL(imageUrl);
+                return;
+            }
+            cropImage.src = imageUrl;
+            currentImageUrl = imageUrl;
+
+            // Once the image is loaded, initialize the cropper
+            cropImage.onload = function() {
+                console.log(`Image loaded: ${cropImage.width}x${cropImage.height}`);
+
+                // The image dimensions are known once onload fires, so the
+                // cropper can measure it right away
+                cropper = new Cropper(cropImage, {
+                    viewMode: 1,
+                    dragMode: 'crop',
+                    autoCropArea: 0.8,
+                    responsive: true,
+                    restore: false,
+                    guides: true,
+                    center: true,
+                    highlight: true,
+                    cropBoxMovable: true,
+                    cropBoxResizable: true,
+                    // The browser already applies EXIF orientation; skip
+                    // Cropper's XHR re-read and main-thread EXIF parse
+                    checkOrientation: false,
+                    ready: function() {
+                        console.log('Cropper initialized successfully');
+                    }
+                });
+            };
+
+            // Handle image loading errors
+            cropImage.onerror = function() {
+                errorMessage.textContent = 'Failed to load the image. Please try again with a different image.';
+                errorMessage.style.display = 'block';
+                console.error('Failed to load image');
+            };
+        } catch (error) {
+            console.error('Error opening crop modal:', error);
+            errorMessage.textContent = 'An error occurred while preparing the image for cropping.';
+            errorMessage.style.display = 'block';
+        }
+    }
+
+    // Apply crop to the current image
+    cropBtn.addEventListener('click', function() {
+        if (!cropper || currentCropIndex < 0) {
+            return;
+        }
+
+        try {
+            // Crop in the browser so only the cropped region is uploaded
+            const fileData = selectedFiles[currentCropIndex];
+            const canvas = cropper.getCroppedCanvas({ maxWidth: 2000, maxHeight: 2000 });
+
+            encodeUploadBlob(canvas, blob => {
+                if (!blob) {
+                    errorMessage.textContent = 'Failed to apply crop. Please try again.';
+                    errorMessage.style.display = 'block';
+                    return;
+                }
+
+                // Replace the file with the cropped image
+                const extension = blob.type === 'image/webp' ? '.webp' : '.jpg';
+                const name = fileData.file.name.replace(/\.[^.]+$/, '') + extension;
+                fileData.file = new File([blob], name, { type: blob.type });
+                fileData.cropped = true;
+
+                // Close crop modal
+                closeCropModal();
+
+                // Update file list
+                updateFileList();
+            });
+        } catch (error) {
+            console.error('Error applying crop:', error);
+            errorMessage.textContent = 'Failed to apply crop. Please try again.';
+            errorMessage.style.display = 'block';
+        }
+    });
+
+    // Encode a canvas for upload as WebP, which is noticeably smaller than JPEG
+    // at the same quality; browsers that cannot encode WebP fall back to JPEG
+    function encodeUploadBlob(canvas, callback) {
+        canvas.toBlob(blob => {
+            if (blob && blob.type === 'image/webp') {
+                callback(blob);
+            } else {
+                canvas.toBlob(callback, 'image/jpeg', 0.9);
+            }
+        }, 'image/webp', 0.85);
+    }
+
+    // Close crop modal without applying
+    cancelCropBtn.addEventListener('click', closeCropModal);
+    closeCropBtn.addEventListener('click', closeCropModal);
+
+    // Close crop modal and clean up
+    function closeCropModal() {
+        cropModal.style.display = 'none';
+        document.body.style.overflow = ''; // Restore scrolling
+        if (cropper) {
+            cropper.destroy();
+            cropper = null;
+        }
+        revokeCurrentImageUrl();
+        currentCropIndex = -1;
+    }
+
+    // Release the blob behind the crop preview so its memory can be freed
+    function revokeCurrentImageUrl() {
+        if (currentImageUrl) {
+            URL.revokeObjectURL(currentImageUrl);
+            currentImageUrl = null;
+        }
+        cropImage.removeAttribute('src');
+    }
+
+    // Process and upload images
+    uploadBtn.addEventListener('click', async () => {
+        if (selectedFiles.length === 0) {
+            alert('Please select at least one image file');
+            return;
+        }
+
+        // Show loading spinner
+        loading.style.display = 'block';
+        results.style.display = 'none';
+        results.innerHTML = '';
+
+        // Snapshot the files being uploaded; the list may change while results stream in
+        const uploadedFiles = selectedFiles.slice();
+
+        try {
+            // Send every file in a single request; the server OCRs them concurrently
+            // and streams back one JSON line per file as soon as that file is done
+            const formData = new FormData();
+            uploadedFiles.forEach(fileData => formData.append('files', fileData.file));
+
+            const response = await fetch('/upload_multiple_images_stream/', {
+                method: 'POST',
+                body: formData
+            });
+
+            // Reserve a slot per file so results keep the upload order as they arrive
+            const slots = uploadedFiles.map(() => results.appendChild(document.createElement('div')));
+            results.style.display = 'block';
+
+            if (response.ok) {
+                await readJsonLines(response, item => {
+                    const result = 'analysis' in item ? {
+                        filename: item.filename,
+                        data: item,
+                        cropped: uploadedFiles[item.index].cropped
+                    } : {
+                        filename: item.filename,
+                        error: `Error processing file: ${item.error}`
+                    };
+                    slots[item.index].replaceWith(renderResult(result, item.index));
+                });
+            } else {
+                uploadedFiles.forEach((fileData, index) => {
+                    slots[index].replaceWith(renderResult({
+                        filename: fileData.file.name,
+                        error: `Error processing file: ${response.statusText}`
+                    }, index));
+                });
+            }
+
+            // Hide loading spinner
+            loading.style.display = 'none';
+        } catch (error) {
+            console.error('Error:', error);
+            loading.style.display = 'none';
+            alert('Error processing the images. Please try again.');
+        }
+    });
+
+    // Read a newline-delimited JSON response, handing over each item as it arrives
+    async function readJsonLines(response, onItem) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffered = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) {
+                break;
+            }
+
+            // Keep any incomplete last line until the rest of it arrives
+            buffered += decoder.decode(value, { stream: true });
+            const lines = buffered.split('\n');
+            buffered = lines.pop();
+            lines.filter(line => line.trim()).forEach(line => onItem(JSON.parse(line)));
+        }
+
+        if (buffered.trim()) {
+            onItem(JSON.parse(buffered));
+        }
+    }
+
+    // Create the result card for one prescription
+    function renderResult(result, index) {
+        const resultItem = document.createElement('div');
+        resultItem.className = 'result-item';
+
+        if (result.error) {
+            resultItem.innerHTML = `
+                <div class="result-header">
+                    ${result.filename}
+                </div>
+                <div class="result-body">
+                    <div class="result-content">
+                        <div class="error-message" style="display: block;">
+                            ${result.error}
+                        </div>
+                    </div>
+                </div>
+            `;
+        } else if (!result.data.extracted_text) {
+            // Nothing was recognized; skip the tabs and analysis cards
+            resultItem.innerHTML = `
+                <div class="result-header">
+                    ${result.filename} ${result.cropped ? '<span class="file-badge">Cropped</span>' : ''}
+                </div>
+                <div class="result-body">
+                    <div class="result-content empty-message">No text extracted</div>
+                </div>
+            `;
+        } else {
+            const resultId = `result-${index}`;
+
+            resultItem.innerHTML = `
+                <div class="result-header">
+                    ${result.filename} ${result.cropped ? '<span class="file-badge">Cropped</span>' : ''}
+                </div>
+                <div class="result-body">
+                    <div class="result-tabs">
+                        <div class="result-tab active" data-target="${resultId}-text">
+                            Extracted Text
+                        </div>
+                        <div class="result-tab" data-target="${resultId}-analysis">
+                            Analysis
+                        </div>
+                    </div>
+                    <div class="result-content">
+                        <div id="${resultId}-text" class="result-section active">
+                            <div class="extraction-text">${result.data.extracted_text || 'No text extracted'}</div>
+                        </div>
+                        <div id="${resultId}-analysis" class="result-section">
+                            <div class="analysis-grid">
+                                <div class="analysis-card">
+                                    <h4 class="analysis-title">
+                                        <span class="material-icons">medication</span>
+                                        Medications
+                                    </h4>
+                                    <ul class="analysis-list">
+                                        ${renderAnalysisList(result.data.analysis.medications)}
+                                    </ul>
+                                </div>
+                                <div class="analysis-card">
+                                    <h4 class="analysis-title">
+                                        <span class="material-icons">straighten</span>
+                                        Dosages
+                                    </h4>
+                                    <ul class="analysis-list">
+                                        ${renderAnalysisList(result.data.analysis.dosages)}
+                                    </ul>
+                                </div>
+                                <div class="analysis-card">
+                                    <h4 class="analysis-title">
+                                        <span class="material-icons">schedule</span>
+                                        Frequencies
+                                    </h4>
+                                    <ul class="analysis-list">
+                                        ${renderAnalysisList(result.data.analysis.frequencies)}
+                                    </ul>
+                                </div>
+                                <div class="analysis-card">
+                                    <h4 class="analysis-title">
+                                        <span class="material-icons">calendar_today</span>
+                                        Durations
+                                    </h4>
+                                    <ul class="analysis-list">
+                                        ${renderAnalysisList(result.data.analysis.durations)}
+                                    </ul>
+                                </div>
+                            </div>
+                        </div>
+                    </div>
+                </div>
+            `;
+        }
+
+        return resultItem;
+    }
+
+    // Switch result tabs with one delegated listener on the results container
+    results.addEventListener('click', function(e) {
+        const tab = e.target.closest('.result-tab');
+        if (!tab) {
+            return;
+        }
+
+        const tabsContainer = tab.closest('.result-tabs');
+        const contentContainer = tab.closest('.result-body').querySelector('.result-content');
+
+        // Remove active class from all tabs and sections
+        tabsContainer.querySelectorAll('.result-tab').forEach(t => {
+            t.classList.remove('active');
+        });
+        contentContainer.querySelectorAll('.result-section').forEach(s => {
+            s.classList.remove('active');
+        });
+
+        // Add active class to clicked tab and corresponding section
+        tab.classList.add('active');
+        document.getElementById(tab.dataset.target).classList.add('active');
+    });
+
+    // Helper function to render analysis list
+    function renderAnalysisList(items) {
+        if (!items || items.length === 0) {
+            return '<li class="empty-message">None detected</li>';
+        }
+
+        return items.map(item => `<li>${item}</li>`).join('');
+    }
+
+    // Close modal when clicking outside
+    window.addEventListener('click', function(event) {
+        if (event.target === cropModal) {
+            closeCropModal();
+        }
+    });
+});
@@ -1,4 +1,5 @@
 import requests
+import json
 import os
 import sys
 import time
@@ -45,6 +46,82 @@ def test_upload_endpoint(image_path):
         print(f"❌ Error connecting to upload endpoint: {str(e)}")
         return False
 
+def test_stream_endpoint(image_path):
+    """Test that the streaming endpoint delivers results incrementally."""
+    if not os.path.exists(image_path):
+        print(f"❌ Image file not found: {image_path}")
+        return False
+    
+    try:
+        # Pair the image with a file that fails to decode at once; its line
+        # must arrive well before the image's OCR result
+        with open(image_path, "rb") as f:
+            content = f.read()
+        files = [("files", ("prescription.jpg", content)), ("files", ("broken.jpg", b"not an image"))]
+        
+        # Make sure the image is not answered from the result cache
+        requests.post("http://localhost:8000/cache/clear")
+        
+        # Ask for gzip like a browser does; a compressed stream would arrive
+        # only once every file is done
+        start = time.time()
+        with requests.post(
+            "http://localhost:8000/upload_multiple_images_stream/",
+            files=files,
+            headers={"Accept-Encoding": "gzip"},
+            stream=True
+        ) as response:
+            if response.status_code != 200:
+                print(f"❌ Stream endpoint returned status code {response.status_code}")
+                print(f"Response: {response.text}")
+                return False
+            
+            encoding = response.headers.get("Content-Encoding", "identity")
+            if encoding != "identity":
+                print(f"❌ Stream endpoint response is {encoding}-encoded and will be buffered")
+                return False
+            
+            # Read the body line by line as it arrives, noting when each came in
+            arrivals = []
+            for line in response.iter_lines():
+                if line:
+                    arrivals.append((time.time() - start, json.loads(line)))
+                    print(f"Result after {arrivals[-1][0]:.2f}s: {line.decode()[:80]}")
+        
+        if len(arrivals) != len(files):
+            print(f"❌ Stream endpoint returned {len(arrivals)} results for {len(files)} files")
+            return False
+        
+        # A buffered stream delivers every line at the same moment
+        (first_time, first), (last_time, _) = arrivals[0], arrivals[-1]
+        if first.get("filename") != "broken.jpg" or last_time - first_time < 0.1:
+            print("❌ Stream endpoint results did not arrive incrementally")
+            return False
+        
+        print("✅ Stream endpoint is working!")
+        return True
+    except Exception as e:
+        print(f"❌ Error connecting to stream endpoint: {str(e)}")
+        return False
+
+def test_stream_endpoint_without_files():
+    """Test that the streaming endpoint rejects a request without files."""
+    try:
+        response = requests.post(
+            "http://localhost:8000/upload_multiple_images_stream/",
+            data={"note": "no files attached"}
+        )
+        if response.status_code == 400:
+            print("✅ Stream endpoint rejects requests without files!")
+            return True
+        else:
+            print(f"❌ Stream endpoint returned status code {response.status_code} without files")
+            print(f"Response: {response.text}")
+            return False
+    except Exception as e:
+        print(f"❌ Error connecting to stream endpoint: {str(e)}")
+        return False
+
 def main():
     """Run the API tests."""
     print("Testing Medical Prescription Chatbot API...")
@@ -60,6 +137,8 @@ def main():
     if health_ok and len(sys.argv) > 1:
         image_path = sys.argv[1]
         test_upload_endpoint(image_path)
+        test_stream_endpoint(image_path)
+        test_stream_endpoint_without_files()
     elif health_ok:
         print("\n⚠️ No image path provided. To test the upload endpoint, run:")
         print("python test_api.py path/to/prescription_image.jpg")
@@ -0,0 +1,130 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import numpy as np
+
+from ocr_worker import OCRWorker
+
+# Seconds to wait for the worker to load its models, including a first download
+WORKER_START_TIMEOUT = 300
+
+# Seconds after which a call is considered hung
+CALL_TIMEOUT = 60
+
+def blank_image():
+    """Return a small image without text, which OCRs quickly."""
+    return np.zeros((64, 64, 3), dtype=np.uint8)
+
+def noise_image():
+    """Return a large noisy image, which keeps the worker busy for a while."""
+    return np.random.randint(0, 256, (2000, 2000, 3), dtype=np.uint8)
+
+def wait_for_request(worker):
+    """Wait until the worker process has started serving a request."""
+    deadline = time.time() + CALL_TIMEOUT
+    while worker._current_request.value == -1:
+        if time.time() > deadline:
+            raise TimeoutError("The worker never started the request")
+        time.sleep(0.01)
+
+def test_worker_killed_while_idle(executor):
+    """Test that a worker killed between requests is replaced transparently."""
+    worker = OCRWorker()
+    try:
+        # A first call waits for the worker to be ready
+        executor.submit(worker.readtext, blank_image()).result(timeout=WORKER_START_TIMEOUT)
+        worker._process.kill()
+        
+        # The replacement must serve the next call rather than deadlock on
+        # a queue lock held by the killed worker
+        executor.submit(worker.readtext, blank_image()).result(timeout=WORKER_START_TIMEOUT)
+        print("✅ Worker killed while idle was replaced")
+        return True
+    except TimeoutError:
+        print("❌ Call after killing an idle worker hung")
+        return False
+    except Exception as e:
+        print(f"❌ Call after killing an idle worker failed: {str(e)}")
+        return False
+    finally:
+        worker.close()
+
+def test_worker_killed_during_request(executor):
+    """Test that killing a busy worker fails only the request it was serving."""
+    worker = OCRWorker()
+    try:
+        executor.submit(worker.readtext, blank_image()).result(timeout=WORKER_START_TIMEOUT)
+        
+        # Kill the worker in the middle of a request with another one queued
+        in_flight = executor.submit(worker.readtext, noise_image())
+        wait_for_request(worker)
+        queued = executor.submit(worker.readtext, blank_image())
+        worker._process.kill()
+        
+        try:
+            in_flight.result(timeout=CALL_TIMEOUT)
+            print("❌ Request served by the killed worker did not fail")
+            return False
+        except RuntimeError:
+            pass
+        
+        # The queued request is served by the replacement worker
+        queued.result(timeout=WORKER_START_TIMEOUT)
+        print("✅ Killing a busy worker failed only its in-flight request")
+        return True
+    except TimeoutError:
+        print("❌ Call after killing a busy worker hung")
+        return False
+    except Exception as e:
+        print(f"❌ Call after killing a busy worker failed: {str(e)}")
+        return False
+    finally:
+        worker.close()
+
+def test_worker_killed_before_ready(executor):
+    """Test that a worker dying during startup fails calls instead of hanging."""
+    worker = OCRWorker()
+    try:
+        # Kill the worker while it is still loading its models
+        call = executor.submit(worker.readtext, blank_image())
+        worker._process.kill()
+        
+        try:
+            call.result(timeout=CALL_TIMEOUT)
+            print("❌ Call to a worker that never started did not fail")
+            return False
+        except RuntimeError:
+            pass
+        
+        # Later calls fail straight away rather than respawning the worker
+        try:
+            worker.readtext(blank_image())
+            print("❌ Worker was restarted after failing to start")
+            return False
+        except RuntimeError:
+            pass
+        
+        print("✅ Worker dying during startup fails calls")
+        return True
+    except TimeoutError:
+        print("❌ Call to a worker that died during startup hung")
+        return False
+    finally:
+        worker.close()
+
+def main():
+    """Run the OCR worker tests."""
+    print("Testing OCR worker crash handling...")
+    
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = [
+            test_worker_killed_while_idle(executor),
+            test_worker_killed_during_request(executor),
+            test_worker_killed_before_ready(executor),
+        ]
+    
+    if all(results):
+        print("All OCR worker tests passed! 🎉")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,13 @@
 import os
+from functools import lru_cache
 from transformers import (
     AutoModelForSeq2SeqLM,
     AutoTokenizer,
-    TrainingArguments,
-    Trainer,
+    Seq2SeqTrainingArguments,
+    Seq2SeqTrainer,
     DataCollatorForSeq2Seq
 )
-from datasets import Dataset
+from datasets import load_dataset
 import pandas as pd
 import torch
 import logging
@@ -19,116 +20,179 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# Tokenization is parallelized across map() worker processes; keep the Rust
+# tokenizer single-threaded in each so the cores are not oversubscribed
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+# Train in bf16 on GPUs with native support, Ampere (compute capability 8.0)
+# or newer; T5 activations overflow in fp16, so older GPUs stay in fp32.
+# is_bf16_supported() also reports the slow emulated bf16 of older GPUs
+USE_BF16 = torch.cuda.is_available() and torch.cuda.get_device_capability()[0] >= 8
+
+# Training examples in JSON Lines format
+PRESCRIPTIONS_PATH = "prescriptions.jsonl"
+
+# Maximum token length of inputs and targets
+MAX_LENGTH = 128
+
+# TF32 matmuls need an Ampere (compute capability 8.0) or newer GPU
+USE_TF32 = torch.cuda.is_available() and torch.cuda.get_device_capability()[0] >= 8
+
 def prepare_prescription_data():
     """Prepare prescription dataset for training."""
     try:
-        # Example prescription data structure
-        prescription_data = {
-            'input_text': [
-                "Patient prescribed Amoxicillin 500mg three times daily for 7 days",
-                "Take Metformin 1000mg twice daily with meals",
-                # Add more examples here
-            ],
-            'output_text': [
-                {
-                    "medication": "Amoxicillin",
-                    "dosage": "500mg",
-                    "frequency": "three times daily",
-                    "duration": "7 days"
-                },
-                {
-                    "medication": "Metformin",
-                    "dosage": "1000mg",
-                    "frequency": "twice daily",
-                    "instructions": "with meals"
-                }
-            ]
-        }
-        
-        # Convert to dataset format
-        dataset = Dataset.from_dict({
-            'input_text': prescription_data['input_text'],
-            'output_text': [str(out) for out in prescription_data['output_text']]
-        })
+        # Load the examples from a JSON Lines file, one object per line with
+        # "input_text" and "output_text" (compact JSON) fields. The datasets
+        # library converts it to a memory-mapped Arrow file instead of holding
+        # every example in Python lists
+        dataset = load_dataset("json", data_files=PRESCRIPTIONS_PATH, split="train")
         
         return dataset
     except Exception as e:
         logger.error(f"Error preparing dataset: {str(e)}")
         raise
 
+@lru_cache(maxsize=2)
+def load_tokenizer(model_name):
+    """Load a tokenizer once per process and reuse it across training runs."""
+    return AutoTokenizer.from_pretrained(model_name, use_fast=True)
+
 def train_model():
     """Fine-tune FLAN-T5 model on prescription data."""
     try:
         # Load model and tokenizer
         model_name = "google/flan-t5-base"  # Using FLAN-T5 as it's open source and powerful
-        model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
-        tokenizer = AutoTokenizer.from_pretrained(model_name)
-        
-        # Prepare dataset
-        dataset = prepare_prescription_data()
+        # The model is loaded fresh on every run, since training updates its
+        # weights in place; low_cpu_mem_usage skips the randomly initialized
+        # copy that would otherwise be built before the checkpoint is loaded
+        model = AutoModelForSeq2SeqLM.from_pretrained(model_name, low_cpu_mem_usage=True)
         
-        # Split dataset
-        dataset = dataset.train_test_split(test_size=0.2)
-        
-        # Tokenization function
-        def preprocess_function(examples):
-            inputs = examples["input_text"]
-            targets = examples["output_text"]
-            
-            model_inputs = tokenizer(
-                inputs,
-                max_length=128,
-                padding="max_length",
-                truncation=True
-            )
-            
-            labels = tokenizer(
-                targets,
-                max_length=128,
-                padding="max_length",
-                truncation=True
-            )
-            
-            model_inputs["labels"] = labels["input_ids"]
-            return model_inputs
+        # Recompute activations in the backward pass instead of storing them;
+        # the decoder's key/value cache is incompatible with checkpointing
+        model.gradient_checkpointing_enable()
+        model.config.use_cache = False
         
-        # Tokenize datasets
-        tokenized_dataset = dataset.map(
-            preprocess_function,
-            batched=True,
-            remove_columns=dataset["train"].column_names
-        )
+        tokenizer = load_tokenizer(model_name)
         
         # Define training arguments
-        training_args = TrainingArguments(
+        training_args = Seq2SeqTrainingArguments(
             output_dir="./prescription_model",
             num_train_epochs=5,
             per_device_train_batch_size=8,
             per_device_eval_batch_size=8,
+            # Accumulate 16 micro-batches for an effective batch of 128 per
+            # device; accumulated micro-batches skip DDP's gradient all-reduce
+            # (Trainer wraps them in no_sync), only the step boundary synchronizes
+            gradient_accumulation_steps=16,
+            # Learning rate scaled by sqrt(16) from the default 5e-5 for the
+            # larger effective batch, with gradient clipping for stability
+            learning_rate=2e-4,
+            max_grad_norm=1.0,
+            # Batch sequences of similar length together so little padding is needed
+            group_by_length=True,
+            length_column_name="length",
             warmup_steps=500,
             weight_decay=0.01,
+            # The fused AdamW updates all parameters in a single CUDA kernel
+            optim="adamw_torch_fused" if torch.cuda.is_available() else "adamw_torch",
             logging_dir="./logs",
             logging_steps=100,
             save_strategy="epoch",
             evaluation_strategy="epoch",
             load_best_model_at_end=True,
+            # Per-epoch evaluation only computes the loss; autoregressive
+            # generation would decode every eval example token by token
+            predict_with_generate=False,
+            # Keep only the best and the latest checkpoint on disk, written as
+            # safetensors, which serialize faster than pickled state dicts
+            metric_for_best_model="eval_loss",
+            save_total_limit=2,
+            save_safetensors=True,
+            bf16=USE_BF16,
+            tf32=USE_TF32,
+            # Collate batches in worker processes kept alive across epochs, into
+            # pinned memory so host-to-device copies can overlap compute
+            dataloader_pin_memory=True,
+            dataloader_num_workers=min(4, os.cpu_count() or 1),
+            dataloader_persistent_workers=True,
+            dataloader_prefetch_factor=4,
+            # Under torchrun every parameter gets a gradient each step, so DDP
+            # can skip the unused-parameter search and overlap bucketed
+            # all-reduce with the backward pass
+            ddp_find_unused_parameters=False,
+            ddp_bucket_cap_mb=25,
+            gradient_checkpointing=True,
+            # Fuse the forward/backward kernels with TorchInductor on GPU
+            torch_compile=torch.cuda.is_available(),
+            torch_compile_mode="default",
         )
         
+        # Tokenization function
+        def preprocess_function(examples):
+            inputs = examples["input_text"]
+            targets = examples["output_text"]
+            
+            # Tokenize inputs and targets in one call; text_target fills in
+            # "labels". Padding is left to the data collator, per batch
+            model_inputs = tokenizer(
+                text=inputs,
+                text_target=targets,
+                max_length=MAX_LENGTH,
+                padding=False,
+                truncation=True
+            )
+            
+            # Store input lengths so the length-grouped sampler need not
+            # recompute them
+            model_inputs["length"] = [len(ids) for ids in model_inputs["input_ids"]]
+            return model_inputs
+        
+        # Under torchrun the main process loads and tokenizes first, filling
+        # the datasets cache; the other ranks then load the result from it
+        with training_args.main_process_first(desc="tokenize"):
+            # Prepare dataset
+            dataset = prepare_prescription_data()
+            
+            # Split dataset; a fixed seed keeps the splits, and their cache files, stable
+            dataset = dataset.train_test_split(test_size=0.2, seed=42)
+            
+            # Tokenize datasets on several processes, reusing the result of a
+            # previous run when available; datasets looks it up by the split's
+            # fingerprint and a hash of preprocess_function. No split gets more
+            # workers than rows
+            num_proc = min(8, os.cpu_count() or 1, *(len(split) for split in dataset.values()))
+            tokenized_dataset = dataset.map(
+                preprocess_function,
+                batched=True,
+                num_proc=num_proc,
+                remove_columns=dataset["train"].column_names,
+                load_from_cache_file=True
+            )
+        
         # Initialize trainer
-        trainer = Trainer(
+        trainer = Seq2SeqTrainer(
             model=model,
             args=training_args,
             train_dataset=tokenized_dataset["train"],
             eval_dataset=tokenized_dataset["test"],
-            data_collator=DataCollatorForSeq2Seq(tokenizer=tokenizer, model=model),
+            # Pad each batch to its longest sequence, rounded up to a multiple of 8
+            # for tensor cores; padded label positions are ignored by the loss
+            data_collator=DataCollatorForSeq2Seq(
+                tokenizer=tokenizer,
+                model=model,
+                padding="longest",
+                pad_to_multiple_of=8,
+                label_pad_token_id=-100
+            ),
         )
         
         # Train the model
         trainer.train()
         
-        # Save the model
+        # Save the model; under torchrun only the main process writes
         trainer.save_model("./prescription_model_final")
-        tokenizer.save_pretrained("./prescription_model_final")
+        if trainer.is_world_process_zero():
+            tokenizer.save_pretrained("./prescription_model_final")
         
         logger.info("Model training completed successfully")
         